@@ -1,5 +1,5 @@
 import argparse
-from monitor import price_monitor, position_monitor
+from monitor import price_monitor, position_monitor, snapshot_server
 
 
 def run_price_monitor(args: argparse.Namespace) -> None:
@@ -10,6 +10,10 @@ def run_position_monitor(args: argparse.Namespace) -> None:
     position_monitor.main(sort=args.sort, telegram=args.telegram)
 
 
+def run_snapshot_server(args: argparse.Namespace) -> None:
+    snapshot_server.main(host=args.host, port=args.port, interval=args.interval)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Buibui Moon Trader CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -38,6 +42,17 @@ def main() -> None:
     )
     position_parser.set_defaults(func=run_position_monitor)
 
+    # Top-level 'serve' command
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve cached price/position snapshots over HTTP"
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Bind port")
+    serve_parser.add_argument(
+        "--interval", type=float, default=5, help="Refresh interval in seconds"
+    )
+    serve_parser.set_defaults(func=run_snapshot_server)
+
     args = parser.parse_args()
     args.func(args)
 
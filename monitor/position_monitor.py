@@ -6,15 +6,27 @@ from tabulate import tabulate
 import argparse
 import time
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
-from utils.config_validation import validate_coins_config
-from typing import Any, Dict, List, Optional, Tuple
+from utils.config_watcher import CONFIG_PATH, CoinsConfigWatcher
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from utils.telegram import send_telegram_message
-
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s %(levelname)s:%(message)s")
+from utils import equity_store
+from utils.logging_setup import new_refresh_id, setup_logging
+from utils.resilience import (
+    CALL_DEADLINE,
+    REFRESH_BUDGET,
+    REQUEST_TIMEOUT,
+    forget_symbols,
+    gather_within_budget,
+    is_stale,
+    resilient_call,
+)
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 def sync_binance_time(client: Any) -> None:
@@ -28,24 +40,36 @@ load_dotenv()
 API_KEY = os.getenv("BINANCE_API_KEY")
 API_SECRET = os.getenv("BINANCE_API_SECRET")
 WALLET_TARGET = float(os.getenv("WALLET_TARGET", 0))
-client = Client(API_KEY, API_SECRET)
+# Hourly equity points included in the snapshot and drawn as a sparkline
+EQUITY_CURVE_HOURS = 48
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+client = Client(API_KEY, API_SECRET, requests_params={"timeout": REQUEST_TIMEOUT})
 sync_binance_time(client)
 
 # Load coin config
 try:
-    with open("config/coins.json") as f:
-        coins_config = json.load(f)
-    validate_coins_config(coins_config)
-    COINS_CONFIG = coins_config
-    COIN_ORDER = list(coins_config.keys())
+    config_watcher = CoinsConfigWatcher(CONFIG_PATH)
+    COINS_CONFIG = config_watcher.config
+    COIN_ORDER = list(COINS_CONFIG.keys())
 except json.JSONDecodeError as e:
-    logging.error(f"JSON decode error in config/coins.json: {e}")
+    logger.error(f"JSON decode error in config/coins.json: {e}")
     sys.exit(1)
 except Exception as e:
-    logging.error(f"Error loading config/coins.json: {e}")
+    logger.error(f"Error loading config/coins.json: {e}")
     sys.exit(1)
 
 
+def reload_coins_config() -> Optional[Dict[str, List[str]]]:
+    """Apply edits to coins.json (symbols, order, leverage) without a restart."""
+    global COINS_CONFIG, COIN_ORDER
+    diff = config_watcher.poll()
+    if diff:
+        COINS_CONFIG = config_watcher.config
+        COIN_ORDER = list(COINS_CONFIG.keys())
+        forget_symbols(diff["removed"])
+    return diff
+
+
 def colorize(value: Any, threshold: float = 0) -> Any:
     try:
         value = float(value)
@@ -56,7 +80,7 @@ def colorize(value: Any, threshold: float = 0) -> Any:
         else:
             return f"\033[93m{value:+.2f}%\033[0m"
     except Exception as e:
-        logging.error(f"Error in colorize: {e}")
+        logger.error(f"Error in colorize: {e}")
         return value
 
 
@@ -70,7 +94,7 @@ def colorize_dollar(value: Any) -> str:
         else:
             return f"\033[93m$0.00\033[0m"
     except Exception as e:
-        logging.error(f"Error in colorize_dollar: {e}")
+        logger.error(f"Error in colorize_dollar: {e}")
         return f"${value}"
 
 
@@ -94,8 +118,22 @@ def color_risk_usd(value: float, total_balance: float) -> str:
         return f"\033[92m{formatted}\033[0m"
 
 
-def get_wallet_balance() -> Tuple[float, float]:
-    balances = client.futures_account_balance()
+def call_deadline(refresh_deadline: Optional[float]) -> float:
+    """Per-call deadline, cut short so the call cannot outlive the refresh."""
+    if refresh_deadline is None:
+        return CALL_DEADLINE
+    return max(0.0, min(CALL_DEADLINE, refresh_deadline - time.monotonic()))
+
+
+def get_wallet_balance(
+    refresh_deadline: Optional[float] = None,
+) -> Tuple[float, float]:
+    balances = resilient_call(
+        "account_balance",
+        client.futures_account_balance,
+        cache_key=("account_balance",),
+        deadline=call_deadline(refresh_deadline),
+    )
     for b in balances:
         if b["asset"] == "USDT":
             balance = float(b["balance"])
@@ -105,25 +143,37 @@ def get_wallet_balance() -> Tuple[float, float]:
 
 
 def get_stop_loss_for_symbol(symbol: str) -> Optional[float]:
-    try:
-        orders = client.futures_get_open_orders(symbol=symbol)
-        for o in orders:
-            if o["type"] in ("STOP_MARKET", "STOP") and o.get("reduceOnly"):
-                return float(o["stopPrice"])
-    except Exception:
-        # Suppress excessive error logs, will summarize if needed
-        pass
+    """
+    Stop price of the symbol's reduce-only stop order, or None if it has
+    none. Raises ExchangeUnavailable when the orders cannot be fetched, so
+    "no stop loss" is never confused with "unknown".
+    """
+    orders = resilient_call(
+        "open_orders",
+        client.futures_get_open_orders,
+        symbol=symbol,
+        cache_key=("open_orders", symbol),
+    )
+    for o in orders:
+        if o["type"] in ("STOP_MARKET", "STOP") and o.get("reduceOnly"):
+            return float(o["stopPrice"])
     return None
 
 
-def fetch_open_positions(
-    sort_by: str = "default", descending: bool = True
-) -> Tuple[List[Any], float]:
-
-    positions = client.futures_position_information()
-    filtered = []
-    wallet_balance, _ = get_wallet_balance()
-    total_risk_usd = 0.0
+def collect_positions(
+    wallet_balance: float, refresh_deadline: float
+) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Numeric data for every open position in COINS_CONFIG, plus the summed
+    USD risk to each known stop loss. Every call finishes by
+    `refresh_deadline` (a time.monotonic() value).
+    """
+    positions = resilient_call(
+        "position_information",
+        client.futures_position_information,
+        cache_key=("position_information",),
+        deadline=call_deadline(refresh_deadline),
+    )
 
     # Prepare open positions for parallel stop loss fetching
     open_positions = []
@@ -146,94 +196,103 @@ def fetch_open_positions(
     # Parallelize stop loss fetching
     def fetch_sl(
         symbol: str, side_text: str, entry: float, notional: float
-    ) -> Tuple[str, Any, Any, Any, float, Optional[float]]:
-        try:
-            actual_sl = get_stop_loss_for_symbol(symbol)
-            if actual_sl:
-                if side_text == "SHORT":
-                    sl_percent = (entry - actual_sl) / entry * 100
-                else:
-                    sl_percent = (actual_sl - entry) / entry * 100
-                sl_risk_usd = notional * (sl_percent / 100)
-                sl_size_str = colorize(sl_percent)
-                actual_sl_str = f"{actual_sl:.5f}"
-                sl_usd_str = colorize_dollar(sl_risk_usd)
-            else:
-                sl_percent = None
-                sl_risk_usd = 0.0
-                actual_sl_str = "-"
-                sl_size_str = "-"
-                sl_usd_str = "-"
-            return (
-                symbol,
-                actual_sl_str,
-                sl_size_str,
-                sl_usd_str,
-                sl_risk_usd,
-                sl_percent,
-            )
-        except Exception:
-            return (symbol, "-", "-", "-", 0.0, None)
-
-    sl_results = {}
+    ) -> Tuple[Optional[float], Optional[float], float]:
+        actual_sl = get_stop_loss_for_symbol(symbol)
+        if not actual_sl:
+            return None, None, 0.0
+        if side_text == "SHORT":
+            sl_percent = (entry - actual_sl) / entry * 100
+        else:
+            sl_percent = (actual_sl - entry) / entry * 100
+        return actual_sl, sl_percent, notional * (sl_percent / 100)
+
     cpu_count = os.cpu_count() or 1
     max_workers = max(1, cpu_count // 2)
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(fetch_sl, symbol, side_text, entry, notional)
-            for (
-                symbol,
-                side_text,
-                entry,
-                mark,
-                margin,
-                notional,
-                amt,
-                pos,
-            ) in open_positions
-        ]
-        for future in as_completed(futures):
-            symbol, actual_sl_str, sl_size_str, sl_usd_str, sl_risk_usd, sl_percent = (
-                future.result()
-            )
-            sl_results[symbol] = (
-                actual_sl_str,
-                sl_size_str,
-                sl_usd_str,
-                sl_risk_usd,
-                sl_percent,
-            )
+    tasks: Dict[Hashable, Callable[[], Any]] = {
+        ("sl", symbol): partial(fetch_sl, symbol, side_text, entry, notional)
+        for symbol, side_text, entry, mark, margin, notional, amt, pos in open_positions
+    }
+    sl_results = gather_within_budget(
+        tasks, refresh_deadline - time.monotonic(), max_workers
+    )
 
+    rows = []
+    total_risk_usd = 0.0
     for symbol, side_text, entry, mark, margin, notional, amt, pos in open_positions:
-        side_colored = (
-            f"\033[92m{side_text}\033[0m" if amt > 0 else f"\033[91m{side_text}\033[0m"
-        )
         pnl = float(pos.get("unRealizedProfit", 0))
-        pnl_pct = (pnl / margin) * 100
-        leverage = round(notional / margin)
-        actual_sl_str, sl_size_str, sl_usd_str, sl_risk_usd, sl_percent = (
-            sl_results.get(symbol, ("-", "-", "-", 0.0, None))
+        # No result means the stop loss is unknown, not that there is none
+        sl_missing = ("sl", symbol) not in sl_results
+        actual_sl, sl_percent, sl_risk_usd = sl_results.get(
+            ("sl", symbol), (None, None, 0.0)
         )
         if sl_risk_usd:
             total_risk_usd += sl_risk_usd
+        rows.append(
+            {
+                "symbol": symbol,
+                "side": side_text,
+                "leverage": round(notional / margin),
+                "entry": entry,
+                "mark": mark,
+                "margin": margin,
+                "notional": notional,
+                "pnl": pnl,
+                "pnl_pct": (pnl / margin) * 100,
+                "risk_pct": (margin / wallet_balance) * 100,
+                "sl_price": actual_sl,
+                "sl_percent": sl_percent,
+                "sl_usd": sl_risk_usd,
+                "sl_stale": is_stale(("sl", symbol))
+                or is_stale(("open_orders", symbol)),
+                "sl_missing": sl_missing,
+            }
+        )
+    return rows, total_risk_usd
+
+
+def format_position_rows(
+    positions: List[Dict[str, Any]], sort_by: str = "default", descending: bool = True
+) -> List[Any]:
+    filtered = []
+    for p in positions:
+        side_text = p["side"]
+        side_colored = (
+            f"\033[92m{side_text}\033[0m"
+            if side_text == "LONG"
+            else f"\033[91m{side_text}\033[0m"
+        )
+        if p["sl_missing"]:
+            actual_sl_str = "?"
+            sl_size_str = "?"
+            sl_usd_str = "?"
+        elif p["sl_price"]:
+            actual_sl_str = f"{p['sl_price']:.5f}"
+            sl_size_str = colorize(p["sl_percent"])
+            sl_usd_str = colorize_dollar(p["sl_usd"])
+        else:
+            actual_sl_str = "-"
+            sl_size_str = "-"
+            sl_usd_str = "-"
+        if p["sl_stale"]:
+            actual_sl_str = f"{actual_sl_str} *"
         row = [
-            symbol,  # 0
+            p["symbol"],  # 0
             side_colored,  # 1
-            leverage,  # 2
-            round(entry, 5),  # 3
-            round(mark, 5),  # 4
-            round(margin, 2),  # 5
-            round(notional, 2),  # 6
-            colorize_dollar(pnl),  # 7
-            colorize(pnl_pct),  # 8
-            f"{(margin / wallet_balance) * 100:.2f}%",  # 9
+            p["leverage"],  # 2
+            round(p["entry"], 5),  # 3
+            round(p["mark"], 5),  # 4
+            round(p["margin"], 2),  # 5
+            round(p["notional"], 2),  # 6
+            colorize_dollar(p["pnl"]),  # 7
+            colorize(p["pnl_pct"]),  # 8
+            f"{p['risk_pct']:.2f}%",  # 9
             actual_sl_str,  # 10
             sl_size_str,  # 11
             sl_usd_str,  # 12
         ]
         # Append extra values at the end for sorting (not shown)
-        row.append(pnl_pct)  # index 13
-        row.append(sl_risk_usd)  # index 14
+        row.append(p["pnl_pct"])  # index 13
+        row.append(p["sl_usd"])  # index 14
         filtered.append(row)
 
     # Get coins without open positions
@@ -272,9 +331,7 @@ def fetch_open_positions(
         )
 
     # Remove hidden sort columns
-    filtered = [row[:13] for row in filtered]
-
-    return filtered, total_risk_usd
+    return [row[:13] for row in filtered]
 
 
 def display_progress_bar(current: float, target: float, bar_length: int = 30) -> str:
@@ -288,27 +345,105 @@ def display_progress_bar(current: float, target: float, bar_length: int = 30) ->
     return f"Wallet Target: ${current:,.2f} / ${target:,.2f} |{bar}| {pct*100:.1f}%"
 
 
+def sparkline(values: List[float]) -> str:
+    low, high = min(values), max(values)
+    span = high - low
+    if not span:
+        return SPARK_CHARS[0] * len(values)
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[round((v - low) / span * top)] for v in values)
+
+
+def format_equity_history(snapshot: Dict[str, Any]) -> List[str]:
+    """Equity curve, drawdown and progress-rate lines from a position snapshot."""
+    lines = []
+    curve = [equity for _, equity in snapshot["equity_curve"]]
+    if len(curve) >= 2:
+        lines.append(
+            f"📈 Equity {len(curve)}h: {sparkline(curve)} "
+            f"(${min(curve):,.2f} – ${max(curve):,.2f})"
+        )
+    lines.append(
+        f"📉 Max Drawdown: ${snapshot['max_drawdown_usd']:,.2f} "
+        f"({snapshot['max_drawdown_pct']:.2f}%)"
+    )
+    rate = snapshot["target_pace"]
+    if rate:
+        eta = rate["eta_days"]
+        eta_str = f"{eta:.1f} days" if eta is not None else "n/a"
+        lines.append(f"📅 Target Pace: ${rate['per_day']:+,.2f}/day (ETA {eta_str})")
+    return lines
+
+
+def get_position_snapshot() -> Dict[str, Any]:
+    """
+    Account summary and numeric open positions for one refresh. Fresh
+    snapshots are also appended to the equity history.
+    """
+    new_refresh_id()
+    # One budget for the whole refresh, including the wallet call
+    refresh_deadline = time.monotonic() + REFRESH_BUDGET
+    wallet, unrealized = get_wallet_balance(refresh_deadline)
+    positions, total_risk_usd = collect_positions(wallet, refresh_deadline)
+    total = wallet + unrealized
+    used_margin = sum(p["margin"] for p in positions)
+    stale = is_stale(("account_balance",)) or is_stale(("position_information",))
+    if not stale:
+        equity_store.record_snapshot(wallet, unrealized, used_margin, total_risk_usd)
+    dd_usd, dd_pct = equity_store.max_drawdown("1h")
+    return {
+        "wallet": wallet,
+        "unrealized": unrealized,
+        "unrealized_pct": (unrealized / wallet * 100) if wallet else 0,
+        "total": total,
+        "used_margin": used_margin,
+        "available": total - used_margin,
+        "total_sl_risk": total_risk_usd,
+        "wallet_target": WALLET_TARGET,
+        "max_drawdown_usd": dd_usd,
+        "max_drawdown_pct": dd_pct,
+        "equity_curve": equity_store.equity_curve("1h")[-EQUITY_CURVE_HOURS:],
+        "target_pace": (
+            equity_store.progress_rate(WALLET_TARGET) if WALLET_TARGET > 0 else None
+        ),
+        "stale": stale,
+        "sl_missing": [p["symbol"] for p in positions if p["sl_missing"]],
+        "positions": positions,
+    }
+
+
 def display_table(
     sort_by: str = "default", descending: bool = True, telegram: bool = False
 ) -> str:
-    table, total_risk_usd = fetch_open_positions(sort_by, descending)
-    wallet, unrealized = get_wallet_balance()
-    total = wallet + unrealized
-    unrealized_pct = (unrealized / wallet * 100) if wallet else 0
-    used_margin = sum(
-        float(row[5]) for row in table if isinstance(row[5], (int, float))
-    )
-    available_balance = total - used_margin
+    snapshot = get_position_snapshot()
+    table = format_position_rows(snapshot["positions"], sort_by, descending)
+    wallet = snapshot["wallet"]
+    unrealized = snapshot["unrealized"]
+    unrealized_pct = snapshot["unrealized_pct"]
+    total = snapshot["total"]
+    available_balance = snapshot["available"]
+    total_risk_usd = snapshot["total_sl_risk"]
+    stale = snapshot["stale"]
+    history_lines = format_equity_history(snapshot)
     output = []
+    if stale:
+        output.append("\n⏳ Exchange unavailable — showing last known values")
     output.append(f"\n💰 Wallet Balance: ${wallet:,.2f}")
     output.append(f"💼 Available Balance: ${available_balance:,.2f}")
     output.append(
         f"📊 Total Unrealized PnL: {colorize_dollar(unrealized)} ({colorize(unrealized_pct)} of wallet)"
     )
     output.append(f"🧾 Wallet w/ Unrealized: ${total:,.2f}")
-    output.append(f"⚠️ Total SL Risk: {color_risk_usd(total_risk_usd, wallet)}\n")
+    output.append(f"⚠️ Total SL Risk: {color_risk_usd(total_risk_usd, wallet)}")
+    if snapshot["sl_missing"]:
+        output.append(
+            f"❓ Stop loss unknown (excluded from SL risk): "
+            f"{', '.join(snapshot['sl_missing'])}"
+        )
+    output.append("")
     if WALLET_TARGET > 0:
         output.append(display_progress_bar(total, WALLET_TARGET))
+    output.extend(history_lines)
     headers = [
         "Symbol",
         "Side",
@@ -342,10 +477,12 @@ def display_table(
             f"🧾 Wallet + PnL: ${total:,.2f}\n"
             f"⚠️ SL Risk: ${total_risk_usd:,.2f}"
         )
+        if history_lines:
+            summary += "\n" + "\n".join(history_lines)
         try:
             send_telegram_message(summary)
         except Exception as e:
-            logging.error(f"❌ Telegram message failed: {e}")
+            logger.error(f"❌ Telegram message failed: {e}")
     return "\n".join(output)
 
 
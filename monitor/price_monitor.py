@@ -10,12 +10,22 @@ from tabulate import tabulate
 from colorama import init, Fore, Style
 import logging
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List, Set, Tuple, Optional
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Set, Tuple, Optional
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from utils.config_validation import validate_coins_config
+from utils.config_watcher import CONFIG_PATH, CoinsConfigWatcher
 from utils.telegram import send_telegram_message
+from utils import candle_store
+from utils.logging_setup import new_refresh_id, setup_logging
+from utils.resilience import (
+    REFRESH_BUDGET,
+    REQUEST_TIMEOUT,
+    forget_symbols,
+    gather_within_budget,
+    is_stale,
+    resilient_call,
+)
 
 # Init colorama
 init(autoreset=True)
@@ -25,7 +35,8 @@ load_dotenv()
 API_KEY = os.getenv("BINANCE_API_KEY")
 API_SECRET = os.getenv("BINANCE_API_SECRET")
 
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s %(levelname)s:%(message)s")
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 def sync_binance_time(client: Any) -> None:
@@ -34,25 +45,72 @@ def sync_binance_time(client: Any) -> None:
     client.TIME_OFFSET = server_time - local_time
 
 
-client = Client(API_KEY, API_SECRET)
+client = Client(API_KEY, API_SECRET, requests_params={"timeout": REQUEST_TIMEOUT})
 sync_binance_time(client)
 
 # Load symbols from config
 try:
-    with open("config/coins.json") as f:
-        coins_config = json.load(f)
-    validate_coins_config(coins_config)
-    COINS = list(coins_config.keys())
+    config_watcher = CoinsConfigWatcher(CONFIG_PATH)
+    COINS = list(config_watcher.config.keys())
 except json.JSONDecodeError as e:
-    logging.error(f"JSON decode error in config/coins.json: {e}")
+    logger.error(f"JSON decode error in config/coins.json: {e}")
     sys.exit(1)
 except Exception as e:
-    logging.error(f"Error loading config/coins.json: {e}")
+    logger.error(f"Error loading config/coins.json: {e}")
     sys.exit(1)
 
+HEADERS = [
+    "Symbol",
+    "Last Price",
+    "15m %",
+    "1h %",
+    "4h %",
+    "Since Asia 8AM",
+    "24h %",
+    "7d %",
+    "30d %",
+    "From 30d High",
+]
+# Row fields rendered under HEADERS[2:], in the same order
+CHANGE_FIELDS = [
+    "change_15m",
+    "change_1h",
+    "change_4h",
+    "change_asia",
+    "change_24h",
+    "change_7d",
+    "change_30d",
+    "from_high_30d",
+]
+
+# Changes served from the local candle store: (column label, lookback minutes)
+HISTORY_INTERVAL = "1h"
+HISTORY_LOOKBACKS = [("4h", 4 * 60), ("7d", 7 * 24 * 60), ("30d", 30 * 24 * 60)]
+
+
+def reload_coins_config() -> Optional[Dict[str, List[str]]]:
+    """
+    Apply edits to coins.json without a restart. Candle store backfill is
+    gap-aware, so the next refresh only downloads history for added symbols
+    while unchanged symbols stay warm. Removed symbols stop rendering and
+    their cached values are dropped.
+    """
+    global COINS
+    diff = config_watcher.poll()
+    if diff:
+        COINS = list(config_watcher.config.keys())
+        forget_symbols(diff["removed"])
+    return diff
+
+
+def error_row(symbol: str) -> List[str]:
+    return [symbol, "Error"] + [""] * (len(HEADERS) - 2)
+
 
 # Format % change with color
 def format_pct(pct: Any) -> Any:
+    if pct is None:
+        return "-"
     try:
         pct = float(pct)
         if pct > 0:
@@ -62,15 +120,17 @@ def format_pct(pct: Any) -> Any:
         else:
             return Fore.YELLOW + f"{pct:+.2f}%" + Style.RESET_ALL
     except Exception as e:
-        logging.error(f"Error in format_pct: {e}")
+        logger.error(f"Error in format_pct: {e}")
         return pct
 
 
 def format_pct_simple(pct: Any) -> str:
+    if pct is None:
+        return "-"
     try:
         return f"{float(pct):+.2f}%"
     except Exception as e:
-        logging.error(f"Error in format_pct_simple: {e}")
+        logger.error(f"Error in format_pct_simple: {e}")
         return str(pct)
 
 
@@ -79,50 +139,65 @@ def get_klines(symbol: str, interval: str, lookback_minutes: int) -> Optional[An
     now = dt.datetime.utcnow()
     start_time = int((now - dt.timedelta(minutes=lookback_minutes)).timestamp() * 1000)
     try:
-        klines = client.get_klines(
-            symbol=symbol, interval=interval, startTime=start_time
+        klines = resilient_call(
+            f"klines:{interval}",
+            client.get_klines,
+            symbol=symbol,
+            interval=interval,
+            startTime=start_time,
+            hedge=True,
         )
         return klines[-1]  # most recent kline
     except Exception as e:
-        # logging.error(f"Error in get_klines for {symbol} [{interval}]: {e}")
+        logger.error(
+            "Error in get_klines for %s [%s]: %s",
+            symbol,
+            interval,
+            e,
+            extra={"sample_key": symbol},
+        )
         return None
 
 
 def batch_get_klines(
-    symbols: List[str], intervals_lookbacks: List[Tuple[str, int]]
+    symbols: List[str],
+    intervals_lookbacks: List[Tuple[str, int]],
+    budget: float = REFRESH_BUDGET,
 ) -> Dict[Tuple[str, str], Any]:
     """
     Batch fetch klines for all symbols and intervals in parallel.
     intervals_lookbacks: list of (interval, lookback_minutes)
     Returns: dict of {(symbol, interval): kline}
+    Requests still running after `budget` seconds fall back to the last good
+    kline (see is_stale(("kline", symbol, interval))).
     """
-    results = {}
 
-    def fetch(
-        symbol: str, interval: str, lookback: int
-    ) -> Tuple[Tuple[str, str], Optional[Any]]:
+    def fetch(symbol: str, interval: str, lookback: int) -> Optional[Any]:
         now = dt.datetime.utcnow()
         start_time = int((now - dt.timedelta(minutes=lookback)).timestamp() * 1000)
-        try:
-            klines = client.get_klines(
-                symbol=symbol, interval=interval, startTime=start_time
-            )
-            return ((symbol, interval), klines[-1] if klines else None)
-        except Exception as e:
-            return ((symbol, interval), None)
+        klines = resilient_call(
+            f"klines:{interval}",
+            client.get_klines,
+            symbol=symbol,
+            interval=interval,
+            startTime=start_time,
+            hedge=True,
+        )
+        return klines[-1] if klines else None
 
     cpu_count = os.cpu_count() or 1
     max_workers = max(1, cpu_count // 2)
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(fetch, symbol, interval, lookback)
-            for symbol in symbols
-            for interval, lookback in intervals_lookbacks
-        ]
-        for future in as_completed(futures):
-            key, kline = future.result()
-            results[key] = kline
-    return results
+    tasks: Dict[Hashable, Callable[[], Any]] = {
+        ("kline", symbol, interval): partial(fetch, symbol, interval, lookback)
+        for symbol in symbols
+        for interval, lookback in intervals_lookbacks
+    }
+    fetched = gather_within_budget(tasks, budget, max_workers)
+    return {
+        (symbol, interval): fetched.get(("kline", symbol, interval))
+        for symbol in symbols
+        for interval, _ in intervals_lookbacks
+    }
 
 
 def get_open_price_asia(symbol: str) -> Optional[float]:
@@ -135,107 +210,208 @@ def get_open_price_asia(symbol: str) -> Optional[float]:
         asia_today_8am -= dt.timedelta(days=1)
 
     start_time = int(asia_today_8am.astimezone(pytz.utc).timestamp() * 1000)
+    # Closed 1m candle is served from the local store once fetched
+    asia_open = candle_store.get_open(client, symbol, "1m", start_time)
+    if asia_open is not None:
+        return asia_open
     try:
-        kline = client.get_klines(
-            symbol=symbol, interval="1m", startTime=start_time, limit=1
+        kline = resilient_call(
+            "klines:1m",
+            client.get_klines,
+            symbol=symbol,
+            interval="1m",
+            startTime=start_time,
+            limit=1,
         )
         return float(kline[0][1]) if kline else None  # open price
     except Exception as e:
-        # logging.error(f"Error in get_open_price_asia for {symbol}: {e}")
+        logger.error(
+            "Error in get_open_price_asia for %s: %s",
+            symbol,
+            e,
+            extra={"sample_key": symbol},
+        )
         return None
 
 
-def get_price_changes(
-    symbols: List[str], telegram: bool = False
-) -> Tuple[List[Any], Set[Any]]:
-    table = []
+def get_historical_opens(symbol: str) -> Dict[str, Optional[float]]:
+    """
+    Opens at each HISTORY_LOOKBACKS point and the high of the closed candles
+    over the longest lookback ("high_30d"), read from the local candle store.
+    Only the candles missing since the last refresh are downloaded, so a warm
+    store costs at most one request per symbol per HISTORY_INTERVAL.
+    """
+    now_ms = int(time.time() * 1000)
+    step = candle_store.INTERVAL_MS[HISTORY_INTERVAL]
+    longest = max(minutes for _, minutes in HISTORY_LOOKBACKS)
+    # Up to the last closed candle, so the 30d high includes recent hours
+    closed_end = candle_store.last_closed_open_time(HISTORY_INTERVAL) + step
+    candle_store.backfill(
+        client, symbol, HISTORY_INTERVAL, now_ms - longest * 60_000, closed_end
+    )
+    opens: Dict[str, Optional[float]] = {}
+    for label, minutes in HISTORY_LOOKBACKS:
+        open_time = candle_store.align(now_ms - minutes * 60_000, HISTORY_INTERVAL)
+        candles = candle_store.get_candles(
+            symbol, HISTORY_INTERVAL, open_time, open_time + step
+        )
+        opens[label] = candles[0][1] if candles else None
+    high_low = candle_store.get_high_low(
+        symbol,
+        HISTORY_INTERVAL,
+        candle_store.align(now_ms - longest * 60_000, HISTORY_INTERVAL),
+        closed_end,
+    )
+    opens["high_30d"] = high_low[0] if high_low else None
+    return opens
+
+
+def pct_change(last_price: float, open_price: Optional[float]) -> Optional[float]:
+    """None when the reference price is unknown, so it renders as missing."""
+    return ((last_price - open_price) / open_price) * 100 if open_price else None
+
+
+def get_price_data(symbols: List[str]) -> Tuple[List[Dict[str, Any]], Set[Any]]:
+    """
+    Numeric price changes per symbol, in `symbols` order. Rows that could
+    not be computed carry an "error" key instead of the change fields; a
+    change whose reference price did not arrive within the budget is None.
+    """
+    new_refresh_id()
+    rows: List[Dict[str, Any]] = []
     invalid_symbols = set()
+    refresh_deadline = time.monotonic() + REFRESH_BUDGET
     # Get all tickers once (much faster)
     try:
-        all_tickers = client.get_ticker()
+        all_tickers = resilient_call(
+            "ticker", client.get_ticker, cache_key=("ticker",), hedge=True
+        )
         ticker_map = {t["symbol"]: t for t in all_tickers}
     except Exception as e:
-        logging.error(f"Error fetching all tickers: {e}")
-        return [[symbol, "Error", "", "", "", ""] for symbol in symbols], set()
+        logger.error("Error fetching all tickers: %s", e)
+        return [{"symbol": symbol, "error": str(e)} for symbol in symbols], set()
 
     # Batch fetch klines for all symbols
     intervals_lookbacks = [("15m", 15), ("1h", 60)]
-    kline_map = batch_get_klines(symbols, intervals_lookbacks)
-
-    def get_asia_open_parallel(symbols: List[str]) -> Dict[str, Optional[float]]:
-        results = {}
+    kline_map = batch_get_klines(
+        symbols, intervals_lookbacks, budget=refresh_deadline - time.monotonic()
+    )
 
-        def fetch(symbol: str) -> Tuple[str, Optional[float]]:
-            return (symbol, get_open_price_asia(symbol))
+    def get_opens_parallel(
+        symbols: List[str],
+    ) -> Dict[Hashable, Tuple[Optional[float], Dict[str, Optional[float]]]]:
+        def fetch(symbol: str) -> Tuple[Optional[float], Dict[str, Optional[float]]]:
+            return (get_open_price_asia(symbol), get_historical_opens(symbol))
 
         cpu_count = os.cpu_count() or 1
         max_workers = max(1, cpu_count // 2)
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(fetch, symbol) for symbol in symbols]
-            for future in as_completed(futures):
-                symbol, asia_open = future.result()
-                results[symbol] = asia_open
-        return results
+        tasks: Dict[Hashable, Callable[[], Any]] = {
+            ("opens", symbol): partial(fetch, symbol) for symbol in symbols
+        }
+        return gather_within_budget(
+            tasks, refresh_deadline - time.monotonic(), max_workers
+        )
 
-    asia_open_map = get_asia_open_parallel(symbols)
+    opens_map = get_opens_parallel(symbols)
 
     for symbol in symbols:
         try:
             ticker = ticker_map.get(symbol)
             if not ticker:
                 invalid_symbols.add((symbol, "Ticker not found"))
-                table.append([symbol, "Error", "", "", "", ""])
+                rows.append({"symbol": symbol, "error": "Ticker not found"})
                 continue
 
             last_price = float(ticker["lastPrice"])
-            change_24h = float(ticker["priceChangePercent"])
 
             # Use batch klines
             k15 = kline_map.get((symbol, "15m"))
             k60 = kline_map.get((symbol, "1h"))
-            open_15 = float(k15[1]) if k15 else last_price
-            open_60 = float(k60[1]) if k60 else last_price
-
-            change_15m = ((last_price - open_15) / open_15) * 100 if open_15 else 0
-            change_1h = ((last_price - open_60) / open_60) * 100 if open_60 else 0
-
-            # Asia session open (parallelized)
-            asia_open = asia_open_map.get(symbol)
-            change_asia = (
-                ((last_price - asia_open) / asia_open) * 100 if asia_open else 0
-            )
-
-            last_price_str = str(round(last_price, 4))
-            if telegram:
-                table.append(
-                    [
-                        symbol,
-                        last_price_str,
-                        format_pct_simple(change_15m),
-                        format_pct_simple(change_1h),
-                        format_pct_simple(change_asia),
-                        format_pct_simple(change_24h),
-                    ]
-                )
-            else:
-                table.append(
-                    [
-                        symbol,
-                        last_price_str,
-                        format_pct(change_15m),
-                        format_pct(change_1h),
-                        format_pct(change_asia),
-                        format_pct(change_24h),
-                    ]
-                )
+            open_15 = float(k15[1]) if k15 else None
+            open_60 = float(k60[1]) if k60 else None
+
+            # Asia session open and historical opens (parallelized, cached)
+            asia_open, history = opens_map.get(("opens", symbol), (None, {}))
+            high_30d = history.get("high_30d")
+            if high_30d is not None:
+                # The store only holds closed candles; add the one still open
+                high_30d = max(high_30d, float(ticker["highPrice"]), last_price)
+
+            stale_keys = [
+                ("ticker",),
+                ("kline", symbol, "15m"),
+                ("kline", symbol, "1h"),
+                ("opens", symbol),
+            ]
+            stale = any(is_stale(key) for key in stale_keys)
+            if stale:
+                invalid_symbols.add((symbol, "Stale data (served from cache)"))
+            row = {
+                "symbol": symbol,
+                "last_price": last_price,
+                "change_15m": pct_change(last_price, open_15),
+                "change_1h": pct_change(last_price, open_60),
+                "change_4h": pct_change(last_price, history.get("4h")),
+                "change_asia": pct_change(last_price, asia_open),
+                "change_24h": float(ticker["priceChangePercent"]),
+                "change_7d": pct_change(last_price, history.get("7d")),
+                "change_30d": pct_change(last_price, history.get("30d")),
+                "from_high_30d": pct_change(last_price, high_30d),
+                "stale": stale,
+            }
+            missing = [
+                header
+                for header, field in zip(HEADERS[2:], CHANGE_FIELDS)
+                if row[field] is None
+            ]
+            if missing:
+                invalid_symbols.add((symbol, f"No data: {', '.join(missing)}"))
+            rows.append(row)
         except Exception as e:
             msg = str(e)
             if "Invalid symbol" in msg:
                 invalid_symbols.add((symbol, "Invalid symbol"))
             else:
                 invalid_symbols.add((symbol, msg))
-            # logging.error(f"Error in get_price_changes for {symbol}: {e}")
-            table.append([symbol, "Error", "", "", "", ""])
+            logger.error(
+                "Error in get_price_data for %s: %s",
+                symbol,
+                e,
+                extra={"sample_key": symbol},
+            )
+            rows.append({"symbol": symbol, "error": msg})
+    return rows, invalid_symbols
+
+
+def get_price_snapshot() -> Dict[str, Any]:
+    """Numeric price rows for every coin plus per-symbol error reasons."""
+    rows, invalid_symbols = get_price_data(COINS)
+    return {
+        "rows": rows,
+        "errors": [
+            {"symbol": symbol, "reason": reason}
+            for symbol, reason in sorted(invalid_symbols)
+        ],
+    }
+
+
+def get_price_changes(
+    symbols: List[str], telegram: bool = False
+) -> Tuple[List[Any], Set[Any]]:
+    rows, invalid_symbols = get_price_data(symbols)
+    fmt = format_pct_simple if telegram else format_pct
+    table = []
+    for row in rows:
+        if "error" in row:
+            table.append(error_row(row["symbol"]))
+            continue
+        table.append(
+            [
+                f"{row['symbol']} *" if row["stale"] else row["symbol"],
+                str(round(row["last_price"], 4)),
+            ]
+            + [fmt(row[field]) for field in CHANGE_FIELDS]
+        )
     return table, invalid_symbols
 
 
@@ -247,7 +423,7 @@ def main(live: bool = False, telegram: bool = False) -> None:
     if not live:
         clear_screen()
         print("📈 Crypto Price Snapshot — Buibui Moon Bot\n")
-        headers = ["Symbol", "Last Price", "15m %", "1h %", "Since Asia 8AM", "24h %"]
+        headers = HEADERS
         price_table, invalid_symbols = get_price_changes(COINS)
         print(tabulate(price_table, headers=headers, tablefmt="fancy_grid"))
 
@@ -269,16 +445,10 @@ def main(live: bool = False, telegram: bool = False) -> None:
     else:
         try:
             while True:
+                reload_coins_config()
                 clear_screen()
                 print("📈 Live Crypto Price Monitor — Buibui Moon Bot\n")
-                headers = [
-                    "Symbol",
-                    "Last Price",
-                    "15m %",
-                    "1h %",
-                    "Since Asia 8AM",
-                    "24h %",
-                ]
+                headers = HEADERS
                 price_table, invalid_symbols = get_price_changes(COINS)
                 print(tabulate(price_table, headers=headers, tablefmt="fancy_grid"))
                 if invalid_symbols:
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from monitor import price_monitor, position_monitor
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 15
+
+# name -> (body, etag); replaced wholesale so readers never see a torn pair
+_snapshots: Dict[str, Tuple[bytes, str]] = {}
+_version = 0
+_changed = threading.Condition()
+
+
+def publish(name: str, data: Any) -> bool:
+    """
+    Store a snapshot if its data changed. The ETag hashes the data only, so
+    an unchanged refresh keeps the old ETag and wakes no SSE clients.
+    """
+    global _version
+    payload = json.dumps(data, separators=(",", ":"), sort_keys=True)
+    etag = '"' + hashlib.sha1(payload.encode()).hexdigest()[:16] + '"'
+    current = _snapshots.get(name)
+    if current and current[1] == etag:
+        return False
+    body = json.dumps(
+        {"name": name, "generated_at": time.time(), "data": data},
+        separators=(",", ":"),
+    ).encode()
+    with _changed:
+        _snapshots[name] = (body, etag)
+        _version += 1
+        _changed.notify_all()
+    return True
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match list, as RFC 9110 requires."""
+    if not if_none_match:
+        return False
+    target = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == target:
+            return True
+    return False
+
+
+def refresh_loop(interval: float) -> None:
+    """
+    Single upstream poller shared by every connected client. Every step is
+    guarded: if this thread died, clients would get frozen snapshots.
+    """
+    while True:
+        started = time.monotonic()
+        try:
+            price_monitor.reload_coins_config()
+            position_monitor.reload_coins_config()
+        except Exception as e:
+            logger.error("Error reloading coins config: %s", e)
+        try:
+            publish("price", price_monitor.get_price_snapshot())
+        except Exception as e:
+            logger.error("Error refreshing price snapshot: %s", e)
+        try:
+            publish("position", position_monitor.get_position_snapshot())
+        except Exception as e:
+            logger.error("Error refreshing position snapshot: %s", e)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+class SnapshotHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s " + format, self.address_string(), *args)
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0].strip("/")
+        if path == "events":
+            self.stream_events()
+        elif path in ("price", "position"):
+            self.send_snapshot(path)
+        else:
+            self.send_error(404, "Use /price, /position or /events")
+
+    def send_snapshot(self, name: str) -> None:
+        snapshot = _snapshots.get(name)
+        if snapshot is None:
+            self.send_error(503, f"{name} snapshot not ready yet")
+            return
+        body, etag = snapshot
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self) -> None:
+        """Server-Sent Events: one `price`/`position` event per change."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        sent: Dict[str, str] = {}
+        seen_version: Optional[int] = None
+        try:
+            while True:
+                with _changed:
+                    if seen_version == _version:
+                        _changed.wait(timeout=KEEPALIVE_SECONDS)
+                    seen_version = _version
+                    snapshots = dict(_snapshots)
+                wrote = False
+                for name, (body, etag) in snapshots.items():
+                    if sent.get(name) == etag:
+                        continue
+                    sent[name] = etag
+                    self.wfile.write(
+                        f"event: {name}\nid: {etag}\ndata: ".encode() + body + b"\n\n"
+                    )
+                    wrote = True
+                if not wrote:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def main(host: str = "127.0.0.1", port: int = 8765, interval: float = 5) -> None:
+    threading.Thread(target=refresh_loop, args=(interval,), daemon=True).start()
+    server = ThreadingHTTPServer((host, port), SnapshotHandler)
+    server.daemon_threads = True
+    print(f"📡 Serving snapshots on http://{host}:{port} (/price, /position, /events)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nExiting gracefully. Goodbye!")
+    finally:
+        server.server_close()
@@ -0,0 +1,290 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from utils.resilience import resilient_call
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DB_PATH = os.getenv("CANDLE_DB_PATH", "data/candles.db")
+PAGE_LIMIT = 1000
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+# (open_time, open, high, low, close, volume, close_time)
+Candle = Tuple[int, float, float, float, float, float, int]
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+_init_lock = threading.Lock()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Open (once) the shared SQLite connection and create the schema.
+    Closed candles never change, so rows are only ever inserted.
+    `coverage` records which [start, end) open_time ranges are fully held.
+    """
+    global _conn
+    if _conn is not None:
+        return _conn
+    with _init_lock:
+        if _conn is not None:
+            return _conn
+        directory = os.path.dirname(DB_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS candles (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                open_time INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                close_time INTEGER NOT NULL,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS coverage (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER NOT NULL,
+                PRIMARY KEY (symbol, interval, start)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def align(timestamp_ms: int, interval: str) -> int:
+    step = INTERVAL_MS[interval]
+    return timestamp_ms - timestamp_ms % step
+
+
+def last_closed_open_time(interval: str, now_ms: Optional[int] = None) -> int:
+    """Open time of the most recent candle that has already closed."""
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    return align(now_ms, interval) - INTERVAL_MS[interval]
+
+
+def _covered_ranges(symbol: str, interval: str) -> List[Tuple[int, int]]:
+    conn = get_connection()
+    with _lock:
+        rows = conn.execute(
+            "SELECT start, end FROM coverage WHERE symbol = ? AND interval = ? "
+            "ORDER BY start",
+            (symbol, interval),
+        ).fetchall()
+    return [(int(s), int(e)) for s, e in rows]
+
+
+def missing_ranges(
+    symbol: str, interval: str, start: int, end: int
+) -> List[Tuple[int, int]]:
+    """
+    Return the [start, end) gaps of open_times not yet held in the store.
+    start/end must be aligned to the interval.
+    """
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in _covered_ranges(symbol, interval):
+        if cov_end <= cursor:
+            continue
+        if cov_start >= end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start))
+        cursor = max(cursor, cov_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def _mark_covered(symbol: str, interval: str, start: int, end: int) -> None:
+    """Add [start, end) to coverage, merging with overlapping/adjacent ranges."""
+    conn = get_connection()
+    with _lock:
+        rows = conn.execute(
+            "SELECT start, end FROM coverage WHERE symbol = ? AND interval = ? "
+            "AND end >= ? AND start <= ?",
+            (symbol, interval, start, end),
+        ).fetchall()
+        for cov_start, cov_end in rows:
+            start = min(start, int(cov_start))
+            end = max(end, int(cov_end))
+        conn.execute(
+            "DELETE FROM coverage WHERE symbol = ? AND interval = ? "
+            "AND end >= ? AND start <= ?",
+            (symbol, interval, start, end),
+        )
+        conn.execute(
+            "INSERT INTO coverage (symbol, interval, start, end) VALUES (?, ?, ?, ?)",
+            (symbol, interval, start, end),
+        )
+        conn.commit()
+
+
+def _insert_klines(symbol: str, interval: str, klines: List[Any]) -> None:
+    conn = get_connection()
+    rows = [
+        (
+            symbol,
+            interval,
+            int(k[0]),
+            float(k[1]),
+            float(k[2]),
+            float(k[3]),
+            float(k[4]),
+            float(k[5]),
+            int(k[6]),
+        )
+        for k in klines
+    ]
+    with _lock:
+        conn.executemany(
+            "INSERT OR IGNORE INTO candles (symbol, interval, open_time, open, high, "
+            "low, close, volume, close_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+
+
+def backfill(client: Any, symbol: str, interval: str, start: int, end: int) -> int:
+    """
+    Download only the missing closed candles in [start, end) using
+    `limit=PAGE_LIMIT` pages. Returns the number of REST calls made.
+    """
+    step = INTERVAL_MS[interval]
+    start = align(start, interval)
+    end = min(align(end, interval), last_closed_open_time(interval) + step)
+    if start >= end:
+        return 0
+
+    calls = 0
+    for gap_start, gap_end in missing_ranges(symbol, interval, start, end):
+        cursor = gap_start
+        while cursor < gap_end:
+            try:
+                # Own breaker, so slow history downloads never open the
+                # one guarding the live klines:<interval> calls
+                klines = resilient_call(
+                    f"backfill:{interval}",
+                    client.get_klines,
+                    symbol=symbol,
+                    interval=interval,
+                    startTime=cursor,
+                    endTime=gap_end - 1,
+                    limit=PAGE_LIMIT,
+                )
+            except Exception as e:
+                logger.error(
+                    "Error backfilling %s [%s] from %s: %s",
+                    symbol,
+                    interval,
+                    cursor,
+                    e,
+                    extra={"sample_key": symbol},
+                )
+                return calls
+            calls += 1
+            klines = [k for k in klines if int(k[0]) < gap_end]
+            if klines:
+                _insert_klines(symbol, interval, klines)
+            if len(klines) < PAGE_LIMIT:
+                # Exchange has nothing more in this gap (e.g. before listing)
+                _mark_covered(symbol, interval, gap_start, gap_end)
+                break
+            cursor = int(klines[-1][0]) + step
+            _mark_covered(symbol, interval, gap_start, cursor)
+    return calls
+
+
+def get_candles(symbol: str, interval: str, start: int, end: int) -> List[Candle]:
+    """Read stored candles with open_time in [start, end). No network."""
+    conn = get_connection()
+    with _lock:
+        rows = conn.execute(
+            "SELECT open_time, open, high, low, close, volume, close_time "
+            "FROM candles WHERE symbol = ? AND interval = ? "
+            "AND open_time >= ? AND open_time < ? ORDER BY open_time",
+            (symbol, interval, start, end),
+        ).fetchall()
+    return [
+        (
+            int(r[0]),
+            float(r[1]),
+            float(r[2]),
+            float(r[3]),
+            float(r[4]),
+            float(r[5]),
+            int(r[6]),
+        )
+        for r in rows
+    ]
+
+
+def get_open(
+    client: Any, symbol: str, interval: str, timestamp_ms: int
+) -> Optional[float]:
+    """
+    Open price of the closed candle containing `timestamp_ms`, backfilling it
+    if it is not stored yet. Returns None if that candle has not closed.
+    """
+    open_time = align(timestamp_ms, interval)
+    if open_time > last_closed_open_time(interval):
+        return None
+    step = INTERVAL_MS[interval]
+    backfill(client, symbol, interval, open_time, open_time + step)
+    candles = get_candles(symbol, interval, open_time, open_time + step)
+    return candles[0][1] if candles else None
+
+
+def get_high_low(
+    symbol: str, interval: str, start: int, end: int
+) -> Optional[Tuple[float, float]]:
+    """
+    Highest high and lowest low over stored candles with open_time in
+    [start, end). No network; backfill the range first if needed.
+    """
+    conn = get_connection()
+    with _lock:
+        row = conn.execute(
+            "SELECT MAX(high), MIN(low) FROM candles WHERE symbol = ? "
+            "AND interval = ? AND open_time >= ? AND open_time < ?",
+            (symbol, interval, start, end),
+        ).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return float(row[0]), float(row[1])
@@ -0,0 +1,71 @@
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.config_validation import validate_coins_config
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config/coins.json"
+
+
+def load_coins_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    """Read and validate coins.json. Raises on invalid JSON or config."""
+    with open(path) as f:
+        config = json.load(f)
+    validate_coins_config(config)
+    return dict(config)
+
+
+def diff_coins_config(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List[str]]:
+    return {
+        "added": [s for s in new if s not in old],
+        "removed": [s for s in old if s not in new],
+        "changed": [s for s in new if s in old and new[s] != old[s]],
+    }
+
+
+class CoinsConfigWatcher:
+    """
+    Tracks coins.json by (mtime, size) so polling costs a single stat() call.
+    The file is only re-read and revalidated when that signature changes.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH) -> None:
+        self.path = path
+        self.signature = self._stat()
+        self.config = load_coins_config(path)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def poll(self) -> Optional[Dict[str, List[str]]]:
+        """
+        Return the diff against the current config if the file changed and
+        the new version is valid, else None. An invalid edit is logged and
+        the previous config is kept until the file changes again.
+        """
+        signature = self._stat()
+        if signature is None or signature == self.signature:
+            return None
+        self.signature = signature
+        try:
+            new_config = load_coins_config(self.path)
+        except Exception as e:
+            logger.error(f"Ignoring invalid {self.path}: {e}")
+            return None
+        diff = diff_coins_config(self.config, new_config)
+        # Key order drives table order, so a pure reorder is still applied
+        if not any(diff.values()) and list(new_config) == list(self.config):
+            return None
+        self.config = new_config
+        logger.info(
+            f"Reloaded {self.path}: +{diff['added']} -{diff['removed']} "
+            f"~{diff['changed']}"
+        )
+        return diff
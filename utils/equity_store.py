@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import logging
+from typing import IO, Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DATA_DIR = os.getenv("EQUITY_DATA_DIR", "data/equity")
+RAW_FILE = "raw.csv"
+LOCK_FILE = "recorder.lock"
+
+# resolution -> (bucket seconds, max buckets kept)
+ROLLUPS: Dict[str, Tuple[int, int]] = {
+    "1m": (60, 7 * 24 * 60),
+    "1h": (60 * 60, 180 * 24),
+    "1d": (24 * 60 * 60, 10 * 365),
+}
+
+# Bucket layout: [start, open, high, low, close, wallet, unrealized,
+#                 used_margin, sl_risk, samples]
+# open/high/low/close track equity (wallet + unrealized); the other
+# fields hold the last sample seen in the bucket.
+Bucket = List[float]
+
+_rollups: Optional[Dict[str, List[Bucket]]] = None
+# resolution -> closed buckets currently in its rollup file
+_closed_counts: Dict[str, int] = {}
+_lock_file: Optional[IO[str]] = None
+_is_recorder = False
+
+
+def _claim_recorder() -> bool:
+    """
+    Rollup state is cached per process, so only one process may write to
+    DATA_DIR: the one holding an exclusive lock on LOCK_FILE, kept until it
+    exits (the OS releases it even on a crash). Others skip recording and
+    re-read the files, and retry the lock on every snapshot.
+    """
+    global _lock_file, _is_recorder, _rollups
+    if _is_recorder:
+        return True
+    os.makedirs(DATA_DIR, exist_ok=True)
+    if _lock_file is None:
+        _lock_file = open(os.path.join(DATA_DIR, LOCK_FILE), "a")
+    try:
+        if sys.platform == "win32":
+            _lock_file.seek(0)
+            msvcrt.locking(_lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(_lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        # Another process owns the files; read its latest state next time
+        _rollups = None
+        return False
+    _is_recorder = True
+    # Drop anything cached while another process was writing
+    _rollups = None
+    return True
+
+
+def _rollup_path(resolution: str) -> str:
+    return os.path.join(DATA_DIR, f"rollup_{resolution}.jsonl")
+
+
+def _open_path(resolution: str) -> str:
+    return os.path.join(DATA_DIR, f"rollup_{resolution}.open.json")
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def _write_closed(resolution: str, closed: List[Bucket]) -> None:
+    """Rewrite the closed-bucket file; only used to trim it."""
+    tmp_path = _rollup_path(resolution) + ".tmp"
+    with open(tmp_path, "w") as f:
+        for b in closed:
+            f.write(json.dumps(b, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, _rollup_path(resolution))
+    _closed_counts[resolution] = len(closed)
+
+
+def _load_resolution(resolution: str, max_buckets: int) -> List[Bucket]:
+    buckets: List[Bucket] = []
+    lines = 0
+    try:
+        with open(_rollup_path(resolution)) as f:
+            for line in f:
+                lines += 1
+                try:
+                    buckets.append(json.loads(line))
+                except ValueError:
+                    # A crash mid-append leaves a torn last line
+                    logger.warning(f"Skipping bad line in {resolution} rollup")
+    except FileNotFoundError:
+        pass
+    _closed_counts[resolution] = lines
+    if lines > max_buckets or len(buckets) < lines:
+        del buckets[:-max_buckets]
+        _write_closed(resolution, buckets)
+    try:
+        with open(_open_path(resolution)) as f:
+            open_bucket = json.load(f)
+        if not buckets or open_bucket[0] > buckets[-1][0]:
+            buckets.append(open_bucket)
+            del buckets[:-max_buckets]
+    except FileNotFoundError:
+        pass
+    return buckets
+
+
+def load_rollups() -> Dict[str, List[Bucket]]:
+    """
+    Each rollup is an append-only file of closed buckets plus a one-bucket
+    tail file for the bucket still filling. Oversized files are trimmed here.
+    """
+    global _rollups
+    if _rollups is None:
+        _rollups = {}
+        for resolution, (_, max_buckets) in ROLLUPS.items():
+            try:
+                _rollups[resolution] = _load_resolution(resolution, max_buckets)
+            except Exception as e:
+                logger.error(f"Error loading {resolution} equity rollup: {e}")
+                _rollups[resolution] = []
+    return _rollups
+
+
+def _update_bucket(
+    buckets: List[Bucket], seconds: int, max_buckets: int, sample: List[float]
+) -> Optional[Bucket]:
+    """Fold `sample` into the open bucket; return the bucket it closed, if any."""
+    ts, wallet, unrealized, used_margin, sl_risk = sample
+    equity = wallet + unrealized
+    start = ts - ts % seconds
+    if buckets and buckets[-1][0] == start:
+        b = buckets[-1]
+        b[2] = max(b[2], equity)
+        b[3] = min(b[3], equity)
+        b[4] = equity
+        b[5:9] = [wallet, unrealized, used_margin, sl_risk]
+        b[9] += 1
+        return None
+    closed = buckets[-1] if buckets else None
+    buckets.append(
+        [
+            start,
+            equity,
+            equity,
+            equity,
+            equity,
+            wallet,
+            unrealized,
+            used_margin,
+            sl_risk,
+            1,
+        ]
+    )
+    del buckets[:-max_buckets]
+    return closed
+
+
+def record_snapshot(
+    wallet: float,
+    unrealized: float,
+    used_margin: float,
+    sl_risk: float,
+    timestamp: Optional[float] = None,
+) -> None:
+    """
+    Append one position snapshot to the raw series and fold it into every
+    rollup. Only a bucket that just closed is appended to its rollup file;
+    the open bucket is kept in a small tail file. Skipped when another
+    process owns DATA_DIR (see _claim_recorder). Failures are logged,
+    never raised, so the view still renders.
+    """
+    ts = int(timestamp if timestamp is not None else time.time())
+    sample = [ts, wallet, unrealized, used_margin, sl_risk]
+    try:
+        if not _claim_recorder():
+            return
+        with open(os.path.join(DATA_DIR, RAW_FILE), "a") as f:
+            f.write(
+                f"{ts},{wallet:.2f},{unrealized:.2f},{used_margin:.2f},{sl_risk:.2f}\n"
+            )
+        rollups = load_rollups()
+        for resolution, (seconds, max_buckets) in ROLLUPS.items():
+            buckets = rollups[resolution]
+            closed = _update_bucket(buckets, seconds, max_buckets, sample)
+            if closed is not None:
+                if _closed_counts.get(resolution, 0) >= 2 * max_buckets:
+                    # Trim so a long-running process keeps the file bounded
+                    _write_closed(resolution, buckets[:-1])
+                else:
+                    with open(_rollup_path(resolution), "a") as f:
+                        f.write(json.dumps(closed, separators=(",", ":")) + "\n")
+                    _closed_counts[resolution] = _closed_counts.get(resolution, 0) + 1
+            _write_json(_open_path(resolution), buckets[-1])
+    except Exception as e:
+        logger.error("Error recording equity snapshot: %s", e)
+
+
+def equity_curve(resolution: str = "1h") -> List[Tuple[int, float]]:
+    """(bucket start, closing equity) pairs at the given resolution."""
+    return [(int(b[0]), b[4]) for b in load_rollups()[resolution]]
+
+
+def max_drawdown(resolution: str = "1h") -> Tuple[float, float]:
+    """
+    Largest peak-to-trough equity drop over the rollup as (usd, pct).
+    Uses bucket opens/highs/lows; order within a bucket is unknown, so a
+    bucket's own high only counts as a peak for the following buckets.
+    """
+    peak = 0.0
+    worst_usd = 0.0
+    worst_pct = 0.0
+    for b in load_rollups()[resolution]:
+        peak = max(peak, b[1])
+        drop = peak - b[3]
+        if drop > worst_usd:
+            worst_usd = drop
+            worst_pct = (drop / peak * 100) if peak else 0.0
+        peak = max(peak, b[2])
+    return worst_usd, worst_pct
+
+
+def progress_rate(
+    target: float, resolution: str = "1d", window: int = 30
+) -> Optional[Dict[str, Any]]:
+    """
+    Average equity change per day over the last `window` buckets and the
+    projected days left to reach `target`. None until two buckets exist.
+    """
+    buckets = load_rollups()[resolution][-window:]
+    if len(buckets) < 2:
+        return None
+    first, last = buckets[0], buckets[-1]
+    days = (last[0] - first[0]) / 86400
+    if days <= 0:
+        return None
+    per_day = (last[4] - first[4]) / days
+    remaining = target - last[4]
+    if remaining <= 0:
+        eta_days: Optional[float] = 0.0
+    elif per_day > 0:
+        eta_days = remaining / per_day
+    else:
+        eta_days = None
+    return {"per_day": per_day, "eta_days": eta_days}
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Per-subsystem overrides, e.g. "monitor.price_monitor=DEBUG,utils.resilience=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+DEFAULT_LEVELS = {"urllib3": "WARNING", "binance": "WARNING"}
+# Each WARNING+ call site may emit at most this many records per window
+SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", 5))
+SAMPLE_WINDOW = float(os.getenv("LOG_SAMPLE_WINDOW", 60))
+
+refresh_id: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "refresh_id", default="-"
+)
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def new_refresh_id() -> str:
+    """Start a refresh: every record logged in this context carries the ID."""
+    rid = uuid.uuid4().hex[:12]
+    refresh_id.set(rid)
+    return rid
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.refresh_id = refresh_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Samples repeated WARNING+ records: the first SAMPLE_BURST in each
+    SAMPLE_WINDOW pass, the rest are dropped and counted, and the count is
+    attached to the next record that gets through. A repeat is the same
+    call site and message template, and the same `sample_key` if the call
+    passes one via `extra` (e.g. the symbol), so one failing symbol cannot
+    hide another. Args are never formatted here.
+    """
+
+    MAX_SITES = 1024
+
+    def __init__(
+        self, burst: int = SAMPLE_BURST, window: float = SAMPLE_WINDOW
+    ) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        # (pathname, lineno, sample key) -> [window start, emitted, suppressed]
+        self._sites: Dict[Tuple[str, int, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        key = (
+            record.pathname,
+            record.lineno,
+            str(getattr(record, "sample_key", record.msg)),
+        )
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._sites and len(self._sites) >= self.MAX_SITES:
+                # Forget keys whose window has passed with nothing suppressed
+                for old in [
+                    k
+                    for k, s in self._sites.items()
+                    if now - s[0] >= self.window and not s[2]
+                ]:
+                    del self._sites[old]
+            site = self._sites.setdefault(key, [now, 0, 0])
+            if now - site[0] >= self.window:
+                site[0], site[1] = now, 0
+            if site[1] >= self.burst:
+                site[2] += 1
+                return False
+            site[1] += 1
+            if site[2]:
+                record.suppressed = int(site[2])
+                site[2] = 0
+        return True
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+    The listener runs in-process, so skip QueueHandler's pickling-oriented
+    prepare() and enqueue the record as is: msg % args, exc_info and the
+    JSON encoding are all done on the listener thread. Pass immutable args
+    (str, numbers), since they are read after the call returns.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+            "refresh_id": getattr(record, "refresh_id", "-"),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = dict(DEFAULT_LEVELS)
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """
+    Route all logging through a QueueHandler so callers only enqueue the
+    record; a QueueListener thread formats JSON and writes to stderr.
+    Safe to call more than once.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        queue_handler = LocalQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        queue_handler.addFilter(RateLimitFilter())
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(JsonFormatter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(LOG_LEVEL.upper())
+        for name, level in _parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
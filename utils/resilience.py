@@ -0,0 +1,258 @@
+import os
+import random
+import threading
+import contextvars
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Socket timeout handed to python-binance so abandoned calls free their thread
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", 10))
+# Per-call deadline covering every retry and hedge of one logical request
+CALL_DEADLINE = float(os.getenv("CALL_DEADLINE", 3))
+# Wall-clock budget for a whole table refresh
+REFRESH_BUDGET = float(os.getenv("REFRESH_BUDGET", 8))
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", 2))
+# Send a duplicate of a hedged call if it has not answered after this long
+HEDGE_AFTER = float(os.getenv("HEDGE_AFTER", 1.0))
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 2.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+
+class ExchangeUnavailable(Exception):
+    """A call failed and there is no last known good value to serve."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures. While open, calls are
+    rejected without touching the network; after `cooldown` seconds one
+    probe is let through and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(
+        self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN
+    ) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return (
+                self.opened_at is not None
+                and time.monotonic() - self.opened_at < self.cooldown
+            )
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # Half-open: re-arm so only one probe goes out per cooldown
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="exchange")
+_breakers: Dict[str, CircuitBreaker] = {}
+_last_good: Dict[Hashable, Any] = {}
+_stale: Set[Hashable] = set()
+_state_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _state_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker()
+        return _breakers[endpoint]
+
+
+def remember(key: Hashable, value: Any) -> None:
+    with _state_lock:
+        _last_good[key] = value
+        _stale.discard(key)
+
+
+def is_stale(key: Hashable) -> bool:
+    """True if the value last served for `key` came from the cache."""
+    with _state_lock:
+        return key in _stale
+
+
+def forget_symbols(symbols: Iterable[str]) -> None:
+    """
+    Drop last good values keyed on any of `symbols`, e.g. coins removed from
+    coins.json, so they are never served stale if the symbol comes back.
+    Keys are tuples with the symbol second, like ("kline", symbol, interval).
+    """
+    drop = set(symbols)
+    with _state_lock:
+        for key in list(_last_good):
+            if isinstance(key, tuple) and len(key) > 1 and key[1] in drop:
+                del _last_good[key]
+                _stale.discard(key)
+
+
+def _fallback(key: Optional[Hashable], reason: str) -> Any:
+    if key is not None:
+        with _state_lock:
+            if key in _last_good:
+                _stale.add(key)
+                logger.warning(
+                    "Serving stale %s: %s", key, reason, extra={"sample_key": key}
+                )
+                return _last_good[key]
+    raise ExchangeUnavailable(reason)
+
+
+def _is_client_error(e: Exception) -> bool:
+    """4xx answers such as an invalid symbol: the endpoint is healthy."""
+    code = getattr(e, "status_code", None)
+    return isinstance(code, int) and 400 <= code < 500 and code not in (408, 418, 429)
+
+
+def _submit(
+    executor: ThreadPoolExecutor, fn: Callable[..., Any], *args: Any, **kwargs: Any
+) -> "Future[Any]":
+    """Submit in a copy of the caller's context so the refresh ID follows."""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args, **kwargs)
+
+
+def _attempt(
+    fn: Callable[..., Any],
+    args: Any,
+    kwargs: Dict[str, Any],
+    timeout: float,
+    hedge_after: float,
+) -> Any:
+    end = time.monotonic() + timeout
+    pending: Set[Future[Any]] = {_submit(_executor, fn, *args, **kwargs)}
+    hedged = hedge_after <= 0
+    last_error: Optional[BaseException] = None
+    while True:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"deadline of {timeout:.1f}s exceeded")
+        done, pending = wait(
+            pending,
+            timeout=remaining if hedged else min(remaining, hedge_after),
+            return_when=FIRST_COMPLETED,
+        )
+        for future in done:
+            error = future.exception()
+            if error is None:
+                return future.result()
+            last_error = error
+        if not pending:
+            raise last_error or TimeoutError("no attempt completed")
+        if not done and not hedged:
+            pending.add(_submit(_executor, fn, *args, **kwargs))
+            hedged = True
+
+
+def resilient_call(
+    endpoint: str,
+    fn: Callable[..., Any],
+    *args: Any,
+    cache_key: Optional[Hashable] = None,
+    deadline: float = CALL_DEADLINE,
+    retries: int = MAX_RETRIES,
+    hedge: bool = False,
+    **kwargs: Any,
+) -> Any:
+    """
+    Call an exchange endpoint within `deadline` seconds, retrying with
+    full-jitter backoff and, if `hedge`, racing a duplicate request after
+    HEDGE_AFTER seconds. Each `endpoint` has its own circuit breaker, which
+    counts one failure per logical call, not per retry. On failure the last
+    good value for `cache_key` is returned and marked stale; without one,
+    ExchangeUnavailable is raised.
+    """
+    if deadline <= 0:
+        # The caller's budget is already spent; that says nothing about
+        # the endpoint, so leave the breaker alone
+        return _fallback(cache_key, f"{endpoint}: no time left")
+    breaker = get_breaker(endpoint)
+    if not breaker.allow():
+        return _fallback(cache_key, f"{endpoint} circuit open")
+
+    end = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        try:
+            result = _attempt(
+                fn, args, kwargs, end - time.monotonic(), HEDGE_AFTER if hedge else 0
+            )
+        except Exception as e:
+            if _is_client_error(e):
+                breaker.record_success()
+                raise
+            attempt += 1
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+            if (
+                attempt > retries
+                or time.monotonic() + delay >= end
+                or breaker.is_open()
+            ):
+                breaker.record_failure()
+                return _fallback(cache_key, f"{endpoint}: {e}")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        if cache_key is not None:
+            remember(cache_key, result)
+        return result
+
+
+def gather_within_budget(
+    tasks: Dict[Hashable, Callable[[], Any]], budget: float, max_workers: int
+) -> Dict[Hashable, Any]:
+    """
+    Run `tasks` in parallel and return whatever finished within `budget`
+    seconds. Unfinished or failed tasks get their last good value (marked
+    stale) or are logged and left out, so the caller never waits on a stuck
+    request.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {_submit(executor, fn): key for key, fn in tasks.items()}
+    done, _ = wait(futures, timeout=max(budget, 0))
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for future, key in futures.items():
+        if future in done and future.exception() is None:
+            value = future.result()
+            if value is not None:
+                remember(key, value)
+            results[key] = value
+            continue
+        reason = str(future.exception()) if future in done else "refresh budget"
+        try:
+            results[key] = _fallback(key, reason)
+        except ExchangeUnavailable:
+            logger.warning("No data for %s: %s", key, reason, extra={"sample_key": key})
+    return results
@@ -3,7 +3,7 @@ import requests
 from dotenv import load_dotenv
 import logging
 
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s %(levelname)s:%(message)s")
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -13,7 +13,7 @@ CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
 def send_telegram_message(text: str) -> None:
     if not BOT_TOKEN or not CHAT_ID:
-        logging.error("Telegram not configured properly.")
+        logger.error("Telegram not configured properly.")
         return
 
     url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
@@ -27,4 +27,4 @@ def send_telegram_message(text: str) -> None:
     try:
         requests.post(url, data=payload, timeout=10)
     except Exception as e:
-        logging.error(f"❌ Failed to send Telegram message: {e}")
+        logger.error(f"❌ Failed to send Telegram message: {e}")